@@ -2,11 +2,14 @@ from flask import Flask, request, jsonify
 import pandas as pd
 import os
 import sys
+import time
+import threading
+from functools import wraps
 from flask_cors import CORS
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models')))
 from scaler import process_recipe_request, detect_language, all_sheets
-from nutrition import get_nutrition_for_recipe
+from nutrition import get_nutrition_for_recipe, nutrition_cache
 
 app = Flask(__name__)
 CORS(app)
@@ -25,6 +28,16 @@ API_KEY = os.environ.get("RECIPE_API_KEY")
 if not API_KEY:
     raise RuntimeError("RECIPE_API_KEY environment variable not set! Please configure it in your environment.")
 
+# Per-endpoint limits on in-flight requests and per-request time budgets (seconds).
+# The limits apply per gunicorn worker process; they only bite because workers
+# serve several requests at once via --threads (see Procfile / render.yaml).
+SCALE_MAX_CONCURRENCY = int(os.environ.get("SCALE_MAX_CONCURRENCY", 4))
+NUTRITION_MAX_CONCURRENCY = int(os.environ.get("NUTRITION_MAX_CONCURRENCY", 2))
+SCALE_TIME_BUDGET = float(os.environ.get("SCALE_TIME_BUDGET", 5))
+NUTRITION_TIME_BUDGET = float(os.environ.get("NUTRITION_TIME_BUDGET", 8))
+# Seconds clients are asked to wait before retrying when an endpoint is at its limit.
+RETRY_AFTER_SECONDS = 1
+
 
 def check_api_key():
     key = request.headers.get("X-API-KEY") or request.headers.get("Authorization")
@@ -33,6 +46,31 @@ def check_api_key():
     return key == API_KEY
 
 
+def api_key_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not check_api_key():
+            return jsonify({"error": "Unauthorized: Invalid or missing API key"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def concurrency_limited(max_concurrent):
+    slots = threading.BoundedSemaphore(max_concurrent)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not slots.acquire(blocking=False):
+                return jsonify({"error": "Server busy, please retry shortly."}), 503, {"Retry-After": str(RETRY_AFTER_SECONDS)}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                slots.release()
+        return wrapper
+    return decorator
+
+
 def detect_language_wrapper(recipe_name):
     return detect_language(all_sheets, recipe_name)
 
@@ -43,10 +81,9 @@ def home():
 
 
 @app.route("/scale_recipe", methods=["POST"])
+@api_key_required
+@concurrency_limited(SCALE_MAX_CONCURRENCY)
 def scale_recipe():
-    if not check_api_key():
-        return jsonify({"error": "Unauthorized: Invalid or missing API key"}), 401
-
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing JSON body"}), 400
@@ -61,17 +98,17 @@ def scale_recipe():
         return jsonify({"error": "Translation file not loaded on server."}), 500
 
     try:
-        result = process_recipe_request(recipe_name, int(new_servings), ingredient_translations)
+        deadline = time.monotonic() + SCALE_TIME_BUDGET
+        result = process_recipe_request(recipe_name, int(new_servings), ingredient_translations, deadline=deadline)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/nutrition_info", methods=["POST"])
+@api_key_required
+@concurrency_limited(NUTRITION_MAX_CONCURRENCY)
 def nutrition_info():
-    if not check_api_key():
-        return jsonify({"error": "Unauthorized: Invalid or missing API key"}), 401
-
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing JSON body"}), 400
@@ -83,17 +120,29 @@ def nutrition_info():
         return jsonify({"error": "'recipe_name' is required."}), 400
 
     try:
-        nutrition_data = get_nutrition_for_recipe(recipe_name, detect_language_wrapper, lang_code_override=lang_code)
+        deadline = time.monotonic() + NUTRITION_TIME_BUDGET
+        nutrition_data = get_nutrition_for_recipe(
+            recipe_name, detect_language_wrapper, lang_code_override=lang_code, deadline=deadline
+        )
         return jsonify({
             "recipe": recipe_name,
             "per_ingredient_nutrition": nutrition_data.get("per_ingredient_nutrition", {}),
             "total_nutrition": nutrition_data.get("total_nutrition", {}),
+            "pending_ingredients": nutrition_data.get("pending_ingredients", []),
+            "unmatched_ingredients": nutrition_data.get("unmatched_ingredients", []),
+            "partial": nutrition_data.get("partial", False),
             "language_detected": lang_code or "en"
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/cache_stats", methods=["GET"])
+@api_key_required
+def cache_stats():
+    return jsonify({"nutrition_cache": nutrition_cache.stats()})
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port)
@@ -1,7 +1,12 @@
 import os
+import json
+import sqlite3
+import threading
 import pandas as pd
 import re
-from thefuzz import process
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from rapidfuzz import fuzz, process, utils
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -9,6 +14,20 @@ FOOD_CSV = os.path.join(DATA_DIR, 'food.csv')
 NUTRIENT_CSV = os.path.join(DATA_DIR, 'nutrient.csv')
 FOOD_NUTRIENT_CSV = os.path.join(DATA_DIR, 'food_nutrient.csv')
 
+# One pool shared by all requests in this process, so at most NUTRITION_WORKERS
+# lookups run at a time. Lookups overrunning their deadline stop at the next
+# check_deadline(), so they cannot hold the pool for long.
+NUTRITION_WORKERS = int(os.environ.get("NUTRITION_WORKERS", 4))
+ingredient_executor = ThreadPoolExecutor(max_workers=NUTRITION_WORKERS, thread_name_prefix="nutrition")
+
+# Resolved ingredients are cached on disk so every worker on the host, and every
+# restart, reuses matches that any worker has already computed.
+NUTRITION_CACHE_PATH = os.environ.get("NUTRITION_CACHE_PATH", os.path.join(DATA_DIR, "nutrition_cache.sqlite3"))
+NUTRITION_CACHE_MAX_ENTRIES = int(os.environ.get("NUTRITION_CACHE_MAX_ENTRIES", 5000))
+NUTRITION_CACHE_FLUSH_INTERVAL = float(os.environ.get("NUTRITION_CACHE_FLUSH_INTERVAL", 30))
+# Bump when the matching logic changes so stale entries are dropped.
+NUTRITION_CACHE_SCHEMA_VERSION = 1
+
 # Load USDA datasets once at module load
 food_df = pd.read_csv(FOOD_CSV)
 nutrient_df = pd.read_csv(NUTRIENT_CSV)
@@ -36,6 +55,15 @@ name_alias = {
     "Calcium, Ca": "Calcium", "Iron, Fe": "Iron", "Potassium, K": "Potassium"
 }
 
+# Pre-filtered views so a lookup only touches focus-nutrient rows and
+# already-normalised descriptions.
+food_choices = [utils.default_process(d) for d in food_df['desc_clean'].fillna('')]
+focus_nutrient_ids = [nid for nid, info in nutrient_map.items() if info['name'] in focus_nutrients]
+focus_food_nutrient_df = food_nutrient_df[food_nutrient_df['nutrient_id'].isin(focus_nutrient_ids)].copy()
+focus_food_nutrient_df['nutrient'] = focus_food_nutrient_df['nutrient_id'].map(
+    lambda nid: name_alias.get(nutrient_map[nid]['name'], nutrient_map[nid]['name'])
+)
+
 nutrient_name_translations = {
     'en': {k: k for k in name_alias.values()},
     'ta': {
@@ -142,56 +170,275 @@ def convert_to_grams(qty, unit):
         return qty
 
 def fuzzy_match(ingredient, choices, threshold=50):
-    candidates = process.extract(ingredient, choices, limit=5)
-    print(f"[Nutrition] Candidates for '{ingredient}': {candidates}")
-    matches = [c for c in candidates if c[1] >= threshold]
-    if matches:
-        return matches[0][0]
+    # cdist releases the GIL while scoring, so lookups on other threads run in parallel.
+    # `choices` must already be passed through utils.default_process.
+    if not choices:
+        return None
+    scores = process.cdist(
+        [utils.default_process(ingredient)], choices,
+        scorer=fuzz.WRatio, processor=None, score_cutoff=threshold, workers=1
+    )[0]
+    best = int(scores.argmax())
+    if scores[best] >= threshold:
+        print(f"[Nutrition] Best candidate for '{ingredient}': ('{choices[best]}', {scores[best]:.1f})")
+        return best
     print(f"[Nutrition] No fuzzy match above threshold for '{ingredient}'")
     return None
 
-def get_nutrition(ingredient, quantity, unit):
+class DeadlineExceeded(Exception):
+    pass
+
+def check_deadline(deadline, ingredient):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(f"Time budget exhausted while resolving '{ingredient}'")
+
+class NutritionCache:
+    # Hits, misses and last_used touches are counted in memory and written in one
+    # transaction on put() or every `flush_interval` seconds, so reads never take
+    # the database write lock that all workers share.
+    def __init__(self, path, max_entries, version, flush_interval=30.0, busy_timeout=0.5):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = str(version)
+        self.flush_interval = flush_interval
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized_pid = None
+        self._hits = 0
+        self._misses = 0
+        self._touched = {}
+        self._last_flush = time.monotonic()
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forked processes.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if self._initialized_pid != os.getpid():
+            with self._init_lock:
+                if self._initialized_pid != os.getpid():
+                    try:
+                        self._initialize(conn)
+                    except sqlite3.Error:
+                        conn.close()
+                        raise
+                    self._initialized_pid = os.getpid()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # Creates the schema and drops entries from an older version. Runs once per
+    # process so that later connections only read until they have something to write.
+    def _initialize(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "name TEXT PRIMARY KEY, fdc_id INTEGER, nutrients TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != self.version:
+                print(f"[Nutrition] Cache version changed ({row[0] if row else None} -> {self.version}); clearing")
+                conn.execute("DELETE FROM entries")
+                conn.execute("DELETE FROM stats")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (self.version,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _rollback(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and conn.in_transaction:
+            conn.execute("ROLLBACK")
+
+    def _take_pending(self):
+        with self._lock:
+            pending = (self._hits, self._misses, self._touched)
+            self._hits, self._misses, self._touched = 0, 0, {}
+            self._last_flush = time.monotonic()
+        return pending
+
+    def _restore_pending(self, pending):
+        hits, misses, touched = pending
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            for name, used in touched.items():
+                self._touched[name] = max(used, self._touched.get(name, 0.0))
+
+    def _write_pending(self, conn, pending):
+        hits, misses, touched = pending
+        if touched:
+            conn.executemany(
+                "UPDATE entries SET last_used = MAX(last_used, ?) WHERE name = ?",
+                [(used, name) for name, used in touched.items()]
+            )
+        for key, value in (("hits", hits), ("misses", misses)):
+            if value:
+                conn.execute(
+                    "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + ?",
+                    (key, value, value)
+                )
+
+    def flush(self):
+        pending = self._take_pending()
+        if not any(pending):
+            return
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_pending(conn, pending)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._rollback()
+            self._restore_pending(pending)
+            print(f"[Nutrition] Cache flush failed: {e}")
+
+    def get(self, name):
+        try:
+            row = self._connect().execute("SELECT fdc_id, nutrients FROM entries WHERE name = ?", (name,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[Nutrition] Cache lookup failed for '{name}': {e}")
+            return None
+        with self._lock:
+            if row:
+                self._hits += 1
+                self._touched[name] = time.time()
+            else:
+                self._misses += 1
+            flush_due = time.monotonic() - self._last_flush >= self.flush_interval
+        if flush_due:
+            self.flush()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, name, fdc_id, nutrients):
+        pending = self._take_pending()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (name, fdc_id, nutrients, last_used) VALUES (?, ?, ?, ?)",
+                (name, fdc_id, json.dumps(nutrients), time.time())
+            )
+            self._write_pending(conn, pending)
+            # Once over the limit, evict least recently used entries down to 90% of it
+            # so the next inserts do not each trigger another eviction.
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                keep = self.max_entries - max(1, self.max_entries // 10)
+                conn.execute(
+                    "DELETE FROM entries WHERE name IN (SELECT name FROM entries ORDER BY last_used LIMIT ?)",
+                    (count - keep,)
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._rollback()
+            self._restore_pending(pending)
+            print(f"[Nutrition] Cache store failed for '{name}': {e}")
+
+    # Counts from other workers appear once they flush, at most `flush_interval` later.
+    def stats(self):
+        self.flush()
+        try:
+            conn = self._connect()
+            counters = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"[Nutrition] Cache stats unavailable: {e}")
+            return {"error": str(e)}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+nutrition_cache = NutritionCache(
+    NUTRITION_CACHE_PATH,
+    NUTRITION_CACHE_MAX_ENTRIES,
+    f"{NUTRITION_CACHE_SCHEMA_VERSION}:{len(food_df)}:{len(food_nutrient_df)}",
+    flush_interval=NUTRITION_CACHE_FLUSH_INTERVAL
+)
+
+# Returns the USDA fdc_id and focus-nutrient amounts per 100 g for a cleaned name,
+# or (None, {}) when nothing matches. Raises DeadlineExceeded between stages once
+# `deadline` has passed, so abandoned lookups stop instead of holding a thread.
+def resolve_ingredient(cleaned_name, deadline=None):
+    check_deadline(deadline, cleaned_name)
+    best_idx = fuzzy_match(cleaned_name, food_choices)
+    if best_idx is None:
+        print(f"[Nutrition] No USDA match for '{cleaned_name}'")
+        return None, {}
+    best_match = food_df['desc_clean'].iloc[best_idx]
+    print(f"[Nutrition] Ingredient '{cleaned_name}' matched with '{best_match}'")
+
+    check_deadline(deadline, cleaned_name)
+    matched_ids = food_df.loc[food_df['desc_clean'] == best_match, 'fdc_id'].unique()
+    rows = focus_food_nutrient_df[focus_food_nutrient_df['fdc_id'].isin(matched_ids)]
+    # Prefer the candidate with the most focus nutrients; ties go to the first in food.csv.
+    scores = rows.groupby('fdc_id').size().reindex(matched_ids, fill_value=0)
+    if scores.empty or scores.max() == 0:
+        print(f"[Nutrition] No nutrient data found for '{best_match}'")
+        return None, {}
+    best_fdc_id = scores.idxmax()
+
+    check_deadline(deadline, cleaned_name)
+    per_100g = rows.loc[rows['fdc_id'] == best_fdc_id].groupby('nutrient')['amount'].sum()
+    return int(best_fdc_id), {name: float(value) for name, value in per_100g.items()}
+
+def get_nutrition(ingredient, quantity, unit, deadline=None):
     cleaned_name = clean_ingredient_name(ingredient)
     if cleaned_name is None:
         return {}
-    best_match = fuzzy_match(cleaned_name, food_df['desc_clean'])
-    print(f"[Nutrition] Ingredient '{ingredient}' cleaned as '{cleaned_name}'; matched with '{best_match}'")
-    if not best_match:
-        print(f"[Nutrition] No USDA match for '{ingredient}' cleaned '{cleaned_name}'")
-        return {}
-    matched_rows = food_df[food_df['desc_clean'] == best_match]
-    best_fdc_id, best_score = None, 0
-    for fid in matched_rows['fdc_id'].values:
-        f_nutr = food_nutrient_df[food_nutrient_df['fdc_id'] == fid]
-        score = sum(1 for _, r in f_nutr.iterrows() if nutrient_map.get(r['nutrient_id'], {}).get('name') in focus_nutrients)
-        if score > best_score:
-            best_fdc_id, best_score = fid, score
-    if not best_fdc_id:
-        print(f"[Nutrition] No nutrient data found for '{best_match}'")
+    cached = nutrition_cache.get(cleaned_name)
+    if cached is not None:
+        fdc_id, per_100g = cached
+        print(f"[Nutrition] Cache hit for '{cleaned_name}' (fdc_id={fdc_id})")
+    else:
+        fdc_id, per_100g = resolve_ingredient(cleaned_name, deadline=deadline)
+        nutrition_cache.put(cleaned_name, fdc_id, per_100g)
+    if not per_100g:
         return {}
 
-    f_nutr = food_nutrient_df[food_nutrient_df['fdc_id'] == best_fdc_id]
-    grams = convert_to_grams(quantity, unit)
-    scale = grams / 100.0
-    result = {}
-    for _, row in f_nutr.iterrows():
-        nid = row['nutrient_id']
-        info = nutrient_map.get(nid)
-        if info and info['name'] in focus_nutrients:
-            value = row['amount'] * scale
-            name = name_alias.get(info['name'], info['name'])
-            result[name] = result.get(name, 0.0) + value
+    scale = convert_to_grams(quantity, unit) / 100.0
+    result = {name: value * scale for name, value in per_100g.items()}
     print(f"[Nutrition] Nutrition for '{ingredient}': {result}")
     return result
 
-def get_nutrition_for_recipe(recipe_name, detect_language_func, lang_code_override=None):
+def format_nutrition(nutrition, lang_code):
+    return {
+        translate_nutrient_name(k, lang_code): f"{round(v, 2)} {'kcal' if k == 'Calories' else 'g'}"
+        for k, v in nutrition.items()
+    }
+
+# `deadline` is a time.monotonic() timestamp. Ingredients still unresolved when it
+# passes are left out of the totals and reported in `pending_ingredients`.
+def get_nutrition_for_recipe(recipe_name, detect_language_func, lang_code_override=None, deadline=None):
+    empty_result = {
+        "per_ingredient_nutrition": {},
+        "total_nutrition": {},
+        "pending_ingredients": [],
+        "unmatched_ingredients": [],
+        "partial": False
+    }
+
     sheet_name, lang_col, lang_code, match_df = detect_language_func(recipe_name)
 
     if match_df is None or match_df.empty:
-        return {
-            "per_ingredient_nutrition": {},
-            "total_nutrition": {}
-        }
+        return empty_result
 
     row = match_df.iloc[0]
     if lang_code_override:
@@ -206,39 +453,62 @@ def get_nutrition_for_recipe(recipe_name, detect_language_func, lang_code_overri
         if 'ingredients_en' in row.index:
             ingredient_col = 'ingredients_en'
         else:
-            return {
-                "per_ingredient_nutrition": {},
-                "total_nutrition": {}
-            }
+            return empty_result
 
     ingredient_text = str(row[ingredient_col])
     ingredient_lines = [x.strip() for x in re.split(r",|\n", ingredient_text) if x.strip()]
 
+    parsed_ingredients = []
+    for line in ingredient_lines:
+        parsed = parse_ingredient_line(line)
+        if parsed:
+            parsed_ingredients.append(parsed[0])
+
+    futures = {}
+    for p in parsed_ingredients:
+        future = ingredient_executor.submit(get_nutrition, p["name"], p["amount"], p["unit"], deadline)
+        futures[future] = p["name"]
+
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    _, not_done = wait(futures, timeout=timeout)
+
     total_nutrition = {}
     per_ingredient_nutrition = {}
+    unmatched_ingredients = []
+    pending_ingredients = []
 
-    for line in ingredient_lines:
-        parsed = parse_ingredient_line(line)
-        if not parsed:
+    # Walk futures in submission order so the response keeps the recipe's ingredient order.
+    for future, name in futures.items():
+        if future in not_done:
+            # Drops lookups still queued; running ones stop at their next check_deadline().
+            future.cancel()
+            pending_ingredients.append(name)
             continue
-        p = parsed[0]
-        nut = get_nutrition(p["name"], p["amount"], p["unit"])
-        per_ingredient_nutrition[p["name"]] = {
-            translate_nutrient_name(k, lang_code): f"{round(v, 2)} {'kcal' if k == 'Calories' else 'g'}"
-            for k, v in nut.items()
-        }
+        try:
+            nut = future.result()
+        except DeadlineExceeded:
+            pending_ingredients.append(name)
+            continue
+        except Exception as e:
+            print(f"[Nutrition] Failed to resolve '{name}': {e}")
+            nut = {}
+        if not nut:
+            unmatched_ingredients.append(name)
+        per_ingredient_nutrition[name] = format_nutrition(nut, lang_code)
         for k, v in nut.items():
             total_nutrition[k] = total_nutrition.get(k, 0.0) + v
 
-    translated_nutrition = {
-        translate_nutrient_name(k, lang_code): f"{round(v, 2)} {'kcal' if k == 'Calories' else 'g'}"
-        for k, v in total_nutrition.items()
-    }
+    translated_nutrition = format_nutrition(total_nutrition, lang_code)
 
     print(f"[Nutrition] Per-ingredient nutrition: {per_ingredient_nutrition}")
     print(f"[Nutrition] Total nutrition for '{recipe_name}': {translated_nutrition}")
+    if pending_ingredients:
+        print(f"[Nutrition] Time budget exhausted for '{recipe_name}'; pending: {pending_ingredients}")
 
     return {
         "per_ingredient_nutrition": per_ingredient_nutrition,
-        "total_nutrition": translated_nutrition
+        "total_nutrition": translated_nutrition,
+        "pending_ingredients": pending_ingredients,
+        "unmatched_ingredients": unmatched_ingredients,
+        "partial": bool(pending_ingredients)
     }
@@ -1,4 +1,5 @@
 import re
+import time
 import spacy
 
 nlp = spacy.load("en_core_web_sm")
@@ -26,17 +27,24 @@ def extract_core_name(ingredient_name):
         return toks[-1]
     return ingredient_name
 
-def rewrite_instructions_with_quantity(original_steps, scaled_ingredients, servings):
+# Once `deadline` (a time.monotonic() timestamp) passes, the remaining ingredients
+# are left without inline quantities instead of going through more spaCy parses.
+# Returns the rewritten steps and the names of the ingredients skipped that way.
+def rewrite_instructions_with_quantity(original_steps, scaled_ingredients, servings, deadline=None):
     full_text = ".\n".join(original_steps).strip()
     if not full_text.endswith(('.', '!', '?')):
         full_text += "."
 
     mentioned = set()
+    skipped = []
     skip_prefixes = ['for the', 'for garnishing', 'for seasoning']
 
     for ing in scaled_ingredients:
         if not ing.get("formattedAmount"):
             continue
+        if deadline is not None and time.monotonic() >= deadline:
+            skipped.append(ing["name"].strip())
+            continue
 
         original_name = ing["name"].strip()
         core_name = extract_core_name(original_name)
@@ -86,4 +94,7 @@ def rewrite_instructions_with_quantity(original_steps, scaled_ingredients, servi
     steps = [step.strip() for step in full_text.split(".\n") if step.strip()]
     steps = [step if step.endswith(".") else step + "." for step in steps]
 
-    return steps
+    if skipped:
+        print(f"[Rewriter] Time budget exhausted; skipped: {skipped}")
+
+    return steps, skipped
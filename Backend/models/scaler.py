@@ -88,7 +88,7 @@ def scale_ingredient(item, servings, base=BASE_SERVINGS):
         "formattedAmount": format_fraction(scaled) if scaled > 0 else ""
     }
 
-def process_recipe_request(recipe_name: str, new_servings: int, translation_df: pd.DataFrame):
+def process_recipe_request(recipe_name: str, new_servings: int, translation_df: pd.DataFrame, deadline: float = None):
     sheet_name, lang_col, lang_code, df_row = detect_language(all_sheets, recipe_name)
     if df_row is None or df_row.empty:
         raise ValueError("Recipe not found.")
@@ -131,7 +131,11 @@ def process_recipe_request(recipe_name: str, new_servings: int, translation_df:
         scaled_ingredients.append(scaled)
 
     original_steps = str(row[instr_col]).split(".\n")
-    rewritten_instructions = rewrite_instructions_with_quantity(original_steps, scaled_ingredients, new_servings)
+    # Ingredients skipped after the deadline keep their scaled amounts in "ingredients"
+    # but are not written into the steps.
+    rewritten_instructions, skipped_ingredients = rewrite_instructions_with_quantity(
+        original_steps, scaled_ingredients, new_servings, deadline=deadline
+    )
 
     return {
         "recipe": title,
@@ -147,5 +151,7 @@ def process_recipe_request(recipe_name: str, new_servings: int, translation_df:
             } for ing in scaled_ingredients
         ],
         "steps": rewritten_instructions,
-        "language_detected": lang_code
+        "language_detected": lang_code,
+        "skipped_ingredients": skipped_ingredients,
+        "partial": bool(skipped_ingredients)
     }
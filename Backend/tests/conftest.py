@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import spacy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "models"), os.path.join(BACKEND_DIR, "api")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("RECIPE_API_KEY", "test-key")
+os.environ["NUTRITION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "nutrition_cache.sqlite3")
+
+# Tiny stand-ins for the USDA CSVs, which are not shipped with the repo.
+USDA_FIXTURES = {
+    "food.csv": pd.DataFrame({
+        "fdc_id": [1, 2, 3],
+        "description": ["Onions, raw", "Onions, raw", "Butter, clarified"],
+    }),
+    "nutrient.csv": pd.DataFrame({
+        "id": [1008, 1003, 1004, 1051, 1999],
+        "name": ["Energy", "Protein", "Total lipid (fat)", "Water", "Unranked"],
+        "unit_name": ["KCAL", "G", "G", "G", "G"],
+        "rank": [300, 600, 800, 100, 999999],
+    }),
+    "food_nutrient.csv": pd.DataFrame({
+        "fdc_id": [1, 1, 1, 1, 2, 3, 3],
+        "nutrient_id": [1008, 1003, 1004, 1051, 1008, 1008, 1004],
+        "amount": [40.0, 1.1, 0.1, 89.1, 41.0, 876.0, 99.5],
+    }),
+}
+
+_read_csv = pd.read_csv
+pd.read_csv = lambda path, *args, **kwargs: USDA_FIXTURES[os.path.basename(path)].copy()
+try:
+    import nutrition  # noqa: E402,F401
+finally:
+    pd.read_csv = _read_csv
+
+RECIPE_FIXTURES = {
+    "Sheet1": pd.DataFrame({
+        "name": ["Plain Rice"],
+        "ingredients_en": ["2 cup rice, 1 tsp salt"],
+        "instructions_en": ["Wash the rice.\nBoil with salt until soft."],
+        "cooking": [20],
+    }),
+}
+
+# scaler reads recipe_data.xlsx, which is not shipped, and rewriter loads a spaCy
+# model at import; a blank pipeline is enough for the tests.
+_read_excel = pd.read_excel
+_spacy_load = spacy.load
+pd.read_excel = lambda path, *args, **kwargs: (
+    {name: df.copy() for name, df in RECIPE_FIXTURES.items()}
+    if os.path.basename(str(path)) == "recipe_data.xlsx" else _read_excel(path, *args, **kwargs)
+)
+spacy.load = lambda name, *args, **kwargs: spacy.blank("en")
+try:
+    import scaler  # noqa: E402,F401
+finally:
+    pd.read_excel = _read_excel
+    spacy.load = _spacy_load
@@ -0,0 +1,89 @@
+import threading
+
+from flask import Flask
+
+import app as app_module
+
+AUTH = {"X-API-KEY": "test-key"}
+
+
+def test_concurrency_limited_returns_503_when_full():
+    entered, release = threading.Event(), threading.Event()
+    test_app = Flask(__name__)
+
+    @test_app.route("/slow")
+    @app_module.concurrency_limited(1)
+    def slow():
+        entered.set()
+        release.wait(5)
+        return "done"
+
+    statuses = []
+    worker = threading.Thread(target=lambda: statuses.append(test_app.test_client().get("/slow").status_code))
+    worker.start()
+    assert entered.wait(5)
+
+    busy = test_app.test_client().get("/slow")
+    release.set()
+    worker.join(5)
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert statuses == [200]
+    assert test_app.test_client().get("/slow").status_code == 200
+
+
+def test_unauthenticated_requests_do_not_take_slots(monkeypatch):
+    limit = app_module.NUTRITION_MAX_CONCURRENCY
+    entered, release = threading.Semaphore(0), threading.Event()
+
+    def blocking_nutrition(*args, **kwargs):
+        entered.release()
+        release.wait(5)
+        return {}
+
+    monkeypatch.setattr(app_module, "get_nutrition_for_recipe", blocking_nutrition)
+    body = {"recipe_name": "Test Recipe"}
+    workers = [
+        threading.Thread(target=lambda: app_module.app.test_client().post("/nutrition_info", json=body, headers=AUTH))
+        for _ in range(limit)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in range(limit):
+        assert entered.acquire(timeout=5)
+
+    client = app_module.app.test_client()
+    unauthorized = client.post("/nutrition_info", json=body)
+    busy = client.post("/nutrition_info", json=body, headers=AUTH)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+
+    assert unauthorized.status_code == 401
+    assert busy.status_code == 503
+
+
+def test_cache_stats_requires_api_key():
+    response = app_module.app.test_client().get("/cache_stats")
+
+    assert response.status_code == 401
+
+
+def test_cache_stats_response_shape():
+    response = app_module.app.test_client().get("/cache_stats", headers=AUTH)
+
+    assert response.status_code == 200
+    assert set(response.get_json()["nutrition_cache"]) == {"hits", "misses", "hit_rate", "entries", "max_entries"}
+
+
+def test_scale_recipe_returns_skipped_ingredients_when_budget_is_spent(monkeypatch):
+    monkeypatch.setattr(app_module, "SCALE_TIME_BUDGET", -1)
+
+    response = app_module.app.test_client().post(
+        "/scale_recipe", json={"recipe_name": "Plain Rice", "new_servings": 4}, headers=AUTH
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["skipped_ingredients"] == ["rice", "salt"]
+    assert response.get_json()["partial"] is True
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import nutrition
+
+
+def recipe_lookup(ingredients):
+    match_df = pd.DataFrame({"name": ["Test Recipe"], "ingredients_en": [ingredients]})
+    return lambda recipe_name: ("Sheet1", "name", "en", match_df)
+
+
+def test_resolve_ingredient_prefers_candidate_with_most_focus_nutrients():
+    fdc_id, per_100g = nutrition.resolve_ingredient("onions, raw")
+
+    assert fdc_id == 1
+    assert per_100g == {"Calories": 40.0, "Protein": 1.1, "Fat": 0.1}
+
+
+def test_resolve_ingredient_without_match():
+    assert nutrition.resolve_ingredient("xylophone") == (None, {})
+
+
+def test_resolve_ingredient_stops_once_deadline_has_passed():
+    with pytest.raises(nutrition.DeadlineExceeded):
+        nutrition.resolve_ingredient("onions, raw", deadline=time.monotonic() - 1)
+
+
+def test_expired_deadline_reports_pending_ingredients(monkeypatch):
+    never_set = threading.Event()
+
+    def fake_get_nutrition(ingredient, quantity, unit, deadline=None):
+        if ingredient == "slow beans":
+            never_set.wait()
+        return {"Protein": 1.0}
+
+    monkeypatch.setattr(nutrition, "get_nutrition", fake_get_nutrition)
+
+    try:
+        result = nutrition.get_nutrition_for_recipe(
+            "Test Recipe", recipe_lookup("1 g rice, 1 g slow beans"), deadline=time.monotonic() + 0.5
+        )
+    finally:
+        # Free the shared pool's thread once the call has returned.
+        never_set.set()
+
+    assert result["pending_ingredients"] == ["slow beans"]
+    assert result["partial"] is True
+    assert list(result["per_ingredient_nutrition"]) == ["rice"]
+    assert result["total_nutrition"] == {"Protein": "1.0 g"}
+
+
+def test_deadline_exceeded_inside_lookup_is_pending(monkeypatch):
+    def fake_get_nutrition(ingredient, quantity, unit, deadline=None):
+        raise nutrition.DeadlineExceeded(ingredient)
+
+    monkeypatch.setattr(nutrition, "get_nutrition", fake_get_nutrition)
+
+    result = nutrition.get_nutrition_for_recipe("Test Recipe", recipe_lookup("1 g rice"))
+
+    assert result["pending_ingredients"] == ["rice"]
+    assert result["unmatched_ingredients"] == []
+
+
+def test_failing_ingredient_is_unmatched(monkeypatch):
+    def fake_get_nutrition(ingredient, quantity, unit, deadline=None):
+        if ingredient == "mystery spice":
+            raise ValueError("boom")
+        return {"Calories": 10.0}
+
+    monkeypatch.setattr(nutrition, "get_nutrition", fake_get_nutrition)
+
+    result = nutrition.get_nutrition_for_recipe("Test Recipe", recipe_lookup("1 g rice, 1 g mystery spice"))
+
+    assert result["unmatched_ingredients"] == ["mystery spice"]
+    assert result["pending_ingredients"] == []
+    assert result["partial"] is False
+    assert result["per_ingredient_nutrition"]["mystery spice"] == {}
+    assert result["total_nutrition"] == {"Calories": "10.0 kcal"}
+
+
+def test_ingredient_order_is_preserved(monkeypatch):
+    delays = {"rice": 0.3, "dal": 0.2, "ghee": 0.1, "salt": 0.0}
+
+    def fake_get_nutrition(ingredient, quantity, unit, deadline=None):
+        time.sleep(delays[ingredient])
+        return {"Calories": 1.0}
+
+    monkeypatch.setattr(nutrition, "get_nutrition", fake_get_nutrition)
+
+    result = nutrition.get_nutrition_for_recipe("Test Recipe", recipe_lookup("1 g rice, 1 g dal, 1 g ghee, 1 g salt"))
+
+    assert list(result["per_ingredient_nutrition"]) == ["rice", "dal", "ghee", "salt"]
+    assert result["total_nutrition"] == {"Calories": "4.0 kcal"}
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import nutrition
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "nutrition_cache.sqlite3")
+
+
+def test_cache_path_comes_from_environment():
+    assert nutrition.nutrition_cache.path == os.environ["NUTRITION_CACHE_PATH"]
+
+
+def test_put_get_round_trip(cache_path):
+    cache = nutrition.NutritionCache(cache_path, 10, "1")
+    cache.put("onions, raw", 1, {"Calories": 40.0, "Protein": 1.1})
+    cache.put("xylophone", None, {})
+
+    assert cache.get("onions, raw") == (1, {"Calories": 40.0, "Protein": 1.1})
+    assert cache.get("xylophone") == (None, {})
+    assert cache.get("unknown") is None
+
+
+def test_entries_are_shared_between_instances(cache_path):
+    nutrition.NutritionCache(cache_path, 10, "1").put("ghee", 3, {"Fat": 99.5})
+
+    assert nutrition.NutritionCache(cache_path, 10, "1").get("ghee") == (3, {"Fat": 99.5})
+
+
+def test_warm_get_on_new_thread_does_not_need_write_lock(cache_path):
+    cache = nutrition.NutritionCache(cache_path, 10, "1")
+    cache.put("ghee", 3, {"Fat": 99.5})
+
+    writer = sqlite3.connect(cache_path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    results = []
+    try:
+        thread = threading.Thread(target=lambda: results.append(cache.get("ghee")))
+        thread.start()
+        thread.join(5)
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+    assert results == [(3, {"Fat": 99.5})]
+
+
+def test_least_recently_used_entries_are_evicted(cache_path):
+    cache = nutrition.NutritionCache(cache_path, 3, "1")
+    for name in ["a", "b", "c"]:
+        cache.put(name, 1, {})
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("d", 1, {})
+
+    assert [name for name in "abcd" if cache.get(name) is not None] == ["a", "d"]
+    assert cache.stats()["entries"] == 2
+
+
+def test_version_change_clears_cache(cache_path):
+    old = nutrition.NutritionCache(cache_path, 10, "1")
+    old.put("onions, raw", 1, {"Calories": 40.0})
+    old.get("onions, raw")
+    old.flush()
+
+    new = nutrition.NutritionCache(cache_path, 10, "2")
+
+    assert new.get("onions, raw") is None
+    assert new.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0, "entries": 0, "max_entries": 10}
+
+
+def test_hits_and_misses_are_flushed_in_batches(cache_path):
+    cache = nutrition.NutritionCache(cache_path, 10, "1")
+    cache.put("ghee", 3, {"Fat": 99.5})
+    cache.get("ghee")
+    cache.get("ghee")
+    cache.get("salt")
+
+    reader = nutrition.NutritionCache(cache_path, 10, "1")
+    assert reader.stats()["hits"] == 0
+
+    cache.flush()
+    assert reader.stats() == {"hits": 2, "misses": 1, "hit_rate": 0.6667, "entries": 1, "max_entries": 10}
+
+
+def test_get_nutrition_scales_cached_vector(cache_path, monkeypatch):
+    cache = nutrition.NutritionCache(cache_path, 10, "1")
+    cache.put("onions, raw", 7, {"Calories": 40.0, "Protein": 1.0})
+    monkeypatch.setattr(nutrition, "nutrition_cache", cache)
+
+    def fail_resolve(*args, **kwargs):
+        raise AssertionError("cached ingredient was resolved again")
+
+    monkeypatch.setattr(nutrition, "resolve_ingredient", fail_resolve)
+
+    result = nutrition.get_nutrition("onions", 2, "cups")
+
+    assert result == pytest.approx({"Calories": 192.0, "Protein": 4.8})
+
+
+def test_get_nutrition_stores_resolved_ingredient(cache_path, monkeypatch):
+    cache = nutrition.NutritionCache(cache_path, 10, "1")
+    monkeypatch.setattr(nutrition, "nutrition_cache", cache)
+
+    result = nutrition.get_nutrition("ghee", 50, "g")
+
+    assert result == pytest.approx({"Calories": 438.0, "Fat": 49.75})
+    assert cache.get("butter, clarified") == (3, {"Calories": 876.0, "Fat": 99.5})
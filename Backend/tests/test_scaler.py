@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+import scaler
+from models import rewriter
+
+STEPS = ["Wash the rice.\nBoil with salt until soft."]
+INGREDIENTS = [
+    {"name": "rice", "formattedAmount": "4", "unit": "cup"},
+    {"name": "salt", "formattedAmount": "2", "unit": "tsp"},
+    {"name": "water", "formattedAmount": "", "unit": ""},
+]
+
+
+@pytest.fixture
+def no_spacy(monkeypatch):
+    def fail_nlp(text):
+        raise AssertionError("spaCy should not run")
+
+    monkeypatch.setattr(rewriter, "nlp", fail_nlp)
+
+
+def test_rewriter_inlines_quantities(no_spacy):
+    steps, skipped = rewriter.rewrite_instructions_with_quantity(STEPS, INGREDIENTS[:2], 4)
+
+    assert steps == ["Wash the 4 cup rice.", "Boil with 2 tsp salt until soft."]
+    assert skipped == []
+
+
+def test_rewriter_skips_ingredients_after_deadline(no_spacy):
+    steps, skipped = rewriter.rewrite_instructions_with_quantity(
+        STEPS, INGREDIENTS, 4, deadline=time.monotonic() - 1
+    )
+
+    assert steps == ["Wash the rice.", "Boil with salt until soft."]
+    assert skipped == ["rice", "salt"]
+
+
+def test_scale_recipe_reports_skipped_ingredients():
+    result = scaler.process_recipe_request("Plain Rice", 4, scaler.translation_df, deadline=time.monotonic() - 1)
+
+    assert result["skipped_ingredients"] == ["rice", "salt"]
+    assert result["partial"] is True
+    assert [ing["formattedAmount"] for ing in result["ingredients"]] == ["4", "2"]
+
+
+def test_scale_recipe_within_budget_is_complete():
+    result = scaler.process_recipe_request("Plain Rice", 4, scaler.translation_df, deadline=time.monotonic() + 60)
+
+    assert result["skipped_ingredients"] == []
+    assert result["partial"] is False
+    assert result["steps"] == ["Wash the 4 cup rice.", "Boil with 2 tsp salt until soft."]